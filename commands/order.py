@@ -4,6 +4,9 @@ Order handlers.
 Create, view and complete orders. Supports text commands and inline buttons.
 """
 import random
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Any
 
 import aiosqlite
 from aiogram import F, Router
@@ -11,8 +14,8 @@ from aiogram.filters import Command
 from aiogram.types import CallbackQuery, Message, User
 from loguru import logger
 
-from config import CHAT_ID
-from data.dishes import DISHES_BY_LEVEL
+from config import CHAT_ID_INT
+from data.dishes import DISHES_BY_LEVEL, OPENED_BY_LEVEL
 from data.special_orders import check_special_order
 from data.texts import (
     ALREADY_HAS_ORDER,
@@ -29,21 +32,39 @@ from data.texts import (
     WRONG_CHAT,
 )
 from database import (
-    clear_active_order,
-    fetch_user,
     finish_order_and_level,
     get_active_order,
     get_db,
-    get_last_order,
+    get_user,
+    load_order_context,
     save_active_order,
 )
-from keyboards.main_menu import CALLBACK_DONE, CALLBACK_MY, CALLBACK_NEW, main_menu_kb
-from utils import format_user_mention
+from keyboards.main_menu import CALLBACK_DONE, CALLBACK_MY, CALLBACK_NEW, MAIN_MENU_KB
+from utils import format_user_mention, send_in_background
 
 router = Router()
 
+# Private generator for dish picks, independent of other users of the random module
+_rng = random.Random()
 
-async def generate_regular_order(level: int) -> list[tuple[str, int]]:
+# Template formatters bound once instead of looking up .format on every render
+_format_dish_line = DISH_LINE.format
+_format_new_order = NEW_ORDER_MESSAGE.format
+_format_done = DONE_ORDER.format
+_format_done_level_up = DONE_WITH_LEVEL_UP.format
+
+# Cross count of a (dish_name, crosses) pair, for summing without a Python-level loop
+_crosses_of = itemgetter(1)
+
+# Extra congratulation appended when the completed order count hits a milestone
+_MILESTONE_BY_ORDERS = {
+    40: GAME_COMPLETE,
+    100: TROPHY_GOLD,
+    200: TROPHY_DIAMOND,
+}
+
+
+def generate_regular_order(level: int) -> list[tuple[str, int]]:
     """
     Generate a regular order of 3 dishes.
 
@@ -56,36 +77,151 @@ async def generate_regular_order(level: int) -> list[tuple[str, int]]:
         List of 3 (dish_name, crosses) tuples
     """
     dish_level = min(level, 3)
-    opened = []
-    for lv in range(0, dish_level + 1):
-        opened.extend(DISHES_BY_LEVEL.get(lv, []))
-    current_pool = DISHES_BY_LEVEL.get(dish_level, DISHES_BY_LEVEL[0])
-    cur = random.choice(current_pool)
-    pool = [d for d in opened if d != cur]
-    random.shuffle(pool)
-    take = [cur]
-    for d in pool:
-        if d not in take and len(take) < 3:
-            take.append(d)
-    while len(take) < 3:
-        for d in DISHES_BY_LEVEL[0]:
-            if d not in take:
-                take.append(d)
-            if len(take) == 3:
-                break
-    return take[:3]
-
-def _order_index(total_orders: int) -> int:
+    opened = OPENED_BY_LEVEL[dish_level]
+    current_pool = DISHES_BY_LEVEL.get(dish_level) or DISHES_BY_LEVEL[0]
+    # Current level dishes close the opened pool, so cur's position there is known
+    cur_i = len(opened) - len(current_pool) + _rng.randrange(len(current_pool))
+    # Floyd's sampling of 2 indices from the pool with cur left out: no copies, no shuffle
+    m = len(opened) - 1
+    picked: list[int] = []
+    for j in (m - 2, m - 1):
+        t = _rng.randrange(j + 1)
+        picked.append(j if t in picked else t)
+    return [opened[cur_i], *(opened[i + (i >= cur_i)] for i in picked)]
+
+
+def _render_dish_lines(dishes: list[tuple[str, int]]) -> str:
+    """
+    Render order dishes one per line.
+
+    Args:
+        dishes: List of (dish_name, crosses) tuples
+
+    Returns:
+        Dish lines joined with newlines
+    """
+    return "\n".join([_format_dish_line(name=n, crosses=v) for n, v in dishes])
+
+
+async def _send(message: Message, text: str, **kwargs: Any) -> None:
+    """
+    Reply in the message's chat, logging a failed send.
+
+    Replies are awaited, so the answers of one chat arrive in the order the
+    updates were handled.
+
+    Args:
+        message: Message to reply to
+        text: Reply text
+        **kwargs: Extra message.answer() arguments (e.g. reply_markup)
     """
-    Compute the next order number.
+    try:
+        await message.answer(text, **kwargs)
+    except Exception:
+        logger.opt(exception=True).error("Error sending reply to chat {}", message.chat.id)
+
+
+async def _unpack(message_or_query: Message | CallbackQuery) -> tuple[Message, User] | None:
+    """
+    Extract the message and sender from a command or button press.
+
+    Button presses are acknowledged in the background (the ack only stops the
+    button's loading spinner). Outside the game chat the user is told so.
+
+    Args:
+        message_or_query: Message or CallbackQuery
+
+    Returns:
+        (message, from_user), or None when the event must not be handled
+    """
+    if isinstance(message_or_query, CallbackQuery):
+        message = message_or_query.message
+        from_user: User | None = message_or_query.from_user
+        send_in_background(message_or_query.answer())
+    else:
+        message = message_or_query
+        from_user = message.from_user
+
+    if from_user is None or from_user.is_bot or not isinstance(message, Message):
+        return None
+    if CHAT_ID_INT is not None and message.chat.id != CHAT_ID_INT:
+        await _send(message, WRONG_CHAT)
+        return None
+    return message, from_user
+
+
+async def _create_order(
+    db: aiosqlite.Connection,
+    name_mention: str,
+    user: Mapping[str, Any],
+    last_order: dict[str, Any] | None,
+) -> str:
+    """
+    Generate a regular or special order, save it as active and render its text.
 
     Args:
-        total_orders: Number of completed orders so far
+        db: Database connection
+        name_mention: Mention of the user who requested the order
+        user: User data from database
+        last_order: User's last completed order or None
 
     Returns:
-        Next order number (completed + 1)
+        Order message text
     """
-    return (total_orders or 0) + 1
+    # Number of the order being created (completed orders + 1)
+    idx = (user["total_orders"] or 0) + 1
+
+    last_order_was_special = bool(
+        user["total_orders"] > 0 and last_order and last_order.get("tag")
+    )
+
+    special_result = None if last_order_was_special else check_special_order(idx, user)
+
+    text: str
+    if special_result:
+        tag, order_config = special_result
+        order_type = order_config.get("type", "regular")
+
+        if order_type == "double_previous":
+            if last_order:
+                last_dishes = last_order.get("dishes", [])
+                last_crosses = last_order.get("crosses", 0)
+                doubled_dishes = [(name, crosses * 2) for name, crosses in last_dishes]
+                doubled_crosses = last_crosses * 2
+                text = order_config["text_template"].format(
+                    name=name_mention, doubled_crosses=doubled_crosses
+                )
+                await save_active_order(db, user["user_id"], doubled_dishes, tag, doubled_crosses)
+                return text
+        elif order_type == "half_new_order":
+            level = user["level"]
+            dishes = generate_regular_order(level)
+            half_crosses = sum(map(_crosses_of, dishes)) // 2
+            half_dishes = [(name, crosses // 2) for name, crosses in dishes]
+            # Halving each dish drops a cross per odd dish: the first dish takes the
+            # remainder so that the halves add up to exactly half of the order
+            name0, _ = half_dishes[0]
+            half_dishes[0] = (name0, half_crosses - sum(map(_crosses_of, half_dishes[1:])))
+            lines = _render_dish_lines(half_dishes)
+            text = order_config["text_template"].format(
+                name=name_mention, half_crosses=half_crosses, dishes=lines
+            )
+            await save_active_order(db, user["user_id"], half_dishes, tag, half_crosses)
+            return text
+        elif order_type == "regular":
+            dishes = [order_config["dish"]]
+            text = order_config["text_template"].format(name=name_mention)
+            await save_active_order(db, user["user_id"], dishes, tag, order_config["dish"][1])
+            return text
+
+    level = user["level"]
+    dishes = generate_regular_order(level)
+    total = sum(map(_crosses_of, dishes))
+    lines = _render_dish_lines(dishes)
+    header = _format_new_order(name=name_mention, order_number=idx, dishes=lines)
+    text = f"{header}{ORDER_TOTAL.format(total=total)}"
+    await save_active_order(db, user["user_id"], dishes, None, total)
+    return text
 
 
 async def _handle_new_order(
@@ -95,142 +231,34 @@ async def _handle_new_order(
     Handler for creating a new order.
 
     Works with text commands and inline buttons. Generates regular or special order.
+    Errors are logged; a database error is also reported to the user.
 
     Args:
         message_or_query: Message or CallbackQuery
-
-    Raises:
-        Exception: On DB or send errors
     """
-    try:
-        if isinstance(message_or_query, CallbackQuery):
-            message = message_or_query.message
-            if message is None:
-                await message_or_query.answer()
-                return
-            from_user: User | None = message_or_query.from_user
-            chat = message.chat
-            await message_or_query.answer()
-        else:
-            message = message_or_query
-            from_user = message.from_user
-            chat = message.chat
-
-        if from_user is None or not isinstance(message, Message):
-            return
-        if CHAT_ID and str(chat.id) != str(CHAT_ID):
-            await message.answer(WRONG_CHAT)
-            return
+    unpacked = await _unpack(message_or_query)
+    if unpacked is None:
+        return
+    message, from_user = unpacked
 
+    try:
         async with get_db() as db_conn:
             db: aiosqlite.Connection = db_conn
-            user = await fetch_user(db, from_user.id, from_user.first_name or "")
-            active = await get_active_order(db, user["user_id"])
+            user, active, last_order = await load_order_context(
+                db, from_user.id, from_user.first_name or ""
+            )
 
+            name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
             if active is not None:
-                name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-                await message.answer(
-                    ALREADY_HAS_ORDER.format(name=name_mention),
-                    reply_markup=main_menu_kb(),
-                )
-                return
-
-            idx = _order_index(user["total_orders"])
-
-            last_order_was_special = False
-            if user["total_orders"] > 0:
-                last_order = await get_last_order(db, user["user_id"])
-                if last_order and last_order.get("tag"):
-                    last_order_was_special = True
-
-            if not last_order_was_special:
-                user_flags = {
-                    "has_student_done": user.get("has_student_done", 0),
-                    "has_critic_done": user.get("has_critic_done", 0),
-                    "has_dirty_plate_done": user.get("has_dirty_plate_done", 0),
-                    "has_second_chef_done": user.get("has_second_chef_done", 0),
-                }
-                special_result = check_special_order(idx, user_flags)
+                text = ALREADY_HAS_ORDER.format(name=name_mention)
             else:
-                special_result = None
-
-            if special_result:
-                tag, order_config = special_result
-                order_type = order_config.get("type", "regular")
-
-                if order_type == "double_previous":
-                    last_order = await get_last_order(db, user["user_id"])
-                    if last_order:
-                        last_dishes = last_order.get("dishes", [])
-                        last_crosses = last_order.get("crosses", 0)
-                        doubled_dishes = [
-                            (name, crosses * 2) for name, crosses in last_dishes
-                        ]
-                        doubled_crosses = last_crosses * 2
-                        name_mention = format_user_mention(
-                            from_user.id, user.get("first_name") or ""
-                        )
-                        text = order_config["text_template"].format(
-                            name=name_mention, doubled_crosses=doubled_crosses
-                        )
-                        await save_active_order(db, user["user_id"], doubled_dishes, tag)
-                        await message.answer(text, reply_markup=main_menu_kb())
-                        return
-                elif order_type == "half_new_order":
-                    level = user["level"]
-                    dishes = await generate_regular_order(level)
-                    total = sum(c for (_, c) in dishes)
-                    half_total = total // 2
-                    half_dishes = [(name, max(1, crosses // 2)) for name, crosses in dishes]
-                    half_crosses = sum(v for (_, v) in half_dishes)
-                    if half_dishes and half_crosses != half_total:
-                        diff = half_total - half_crosses
-                        name0, val0 = half_dishes[0]
-                        half_dishes[0] = (name0, max(1, val0 + diff))
-                        half_crosses = half_total
-                    lines = "\n".join(
-                        [DISH_LINE.format(name=n, crosses=v) for (n, v) in half_dishes]
-                    )
-                    name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-                    text = order_config["text_template"].format(
-                        name=name_mention, half_crosses=half_crosses, dishes=lines
-                    )
-                    await save_active_order(db, user["user_id"], half_dishes, tag)
-                    await message.answer(text, reply_markup=main_menu_kb())
-                    return
-                elif order_type == "regular":
-                    dishes = [order_config["dish"]]
-                    name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-                    text = order_config["text_template"].format(name=name_mention)
-                    await save_active_order(db, user["user_id"], dishes, tag)
-                    await message.answer(text, reply_markup=main_menu_kb())
-                    return
+                text = await _create_order(db, name_mention, user, last_order)
+    except Exception:
+        logger.opt(exception=True).error("Error creating order for user {}", from_user.id)
+        await _send(message, "❌ Произошла ошибка при создании заказа. Попробуйте позже.")
+        return
 
-            level = user["level"]
-            dishes = await generate_regular_order(level)
-            total = sum(x[1] for x in dishes)
-            lines = "\n".join([DISH_LINE.format(name=n, crosses=v) for (n, v) in dishes])
-            name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-            order_number = _order_index(user["total_orders"])
-            text = (
-                NEW_ORDER_MESSAGE.format(
-                    name=name_mention, order_number=order_number, dishes=lines
-                )
-                + ORDER_TOTAL.format(total=total)
-            )
-            await save_active_order(db, user["user_id"], dishes, None)
-            await message.answer(text, reply_markup=main_menu_kb())
-    except Exception as e:
-        logger.error(
-            f"Error creating order for user {from_user.id if from_user is not None else '?'}: {e}"
-        )
-        try:
-            if isinstance(message, Message):
-                await message.answer(
-                    "❌ Произошла ошибка при создании заказа. Попробуйте позже.",
-                )
-        except Exception:
-            pass
+    await _send(message, text, reply_markup=MAIN_MENU_KB)
 
 
 @router.message(Command("new"))
@@ -253,64 +281,37 @@ async def _handle_my_order(
     Handler for viewing current active order.
 
     Works with text commands and inline buttons.
+    Errors are logged; a database error is also reported to the user.
 
     Args:
         message_or_query: Message or CallbackQuery
-
-    Raises:
-        Exception: On DB or send errors
     """
-    try:
-        if isinstance(message_or_query, CallbackQuery):
-            message = message_or_query.message
-            if message is None:
-                await message_or_query.answer()
-                return
-            from_user: User | None = message_or_query.from_user
-            chat = message.chat
-            await message_or_query.answer()
-        else:
-            message = message_or_query
-            from_user = message.from_user
-            chat = message.chat
-
-        if from_user is None or not isinstance(message, Message):
-            return
-        if CHAT_ID and str(chat.id) != str(CHAT_ID):
-            await message.answer(WRONG_CHAT)
-            return
+    unpacked = await _unpack(message_or_query)
+    if unpacked is None:
+        return
+    message, from_user = unpacked
 
+    try:
         async with get_db() as db_conn:
             db: aiosqlite.Connection = db_conn
-            user = await fetch_user(db, from_user.id, from_user.first_name or "")
-            active = await get_active_order(db, user["user_id"])
-            if not active:
-                name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-                await message.answer(
-                    NO_ACTIVE_ORDER.format(name=name_mention),
-                    reply_markup=main_menu_kb(),
-                )
-                return
-            dishes = active["dishes"]
-            lines = "\n".join([DISH_LINE.format(name=n, crosses=v) for (n, v) in dishes])
-            total = sum(v for (_, v) in dishes)
-            name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-            text = (
-                f"{SHOW_ORDER_HEADER.format(name=name_mention)}\n\n{lines}"
-                + ORDER_TOTAL.format(total=total)
-            )
-            await message.answer(text, reply_markup=main_menu_kb())
-    except Exception as e:
-        logger.error(
-            f"Error viewing order for user {from_user.id if from_user is not None else '?'}: {e}"
-        )
-        try:
-            if isinstance(message, Message):
-                await message.answer(
-                    "❌ Произошла ошибка при просмотре заказа. Попробуйте позже.",
-                )
-        except Exception:
-            pass
+            user = await get_user(db, from_user.id)
+            active = await get_active_order(db, from_user.id) if user is not None else None
+    except Exception:
+        logger.opt(exception=True).error("Error viewing order for user {}", from_user.id)
+        await _send(message, "❌ Произошла ошибка при просмотре заказа. Попробуйте позже.")
+        return
+
+    first_name = user["first_name"] if user is not None else from_user.first_name
+    name_mention = format_user_mention(from_user.id, first_name or "")
+    if not active:
+        await _send(message, NO_ACTIVE_ORDER.format(name=name_mention), reply_markup=MAIN_MENU_KB)
+        return
+    dishes = active["dishes"]
+    lines = _render_dish_lines(dishes)
+    total = active["crosses"]
+    header = SHOW_ORDER_HEADER.format(name=name_mention)
+    text = f"{header}\n\n{lines}{ORDER_TOTAL.format(total=total)}"
+    await _send(message, text, reply_markup=MAIN_MENU_KB)
 
 
 @router.message(Command("my"))
@@ -333,86 +334,55 @@ async def _handle_done(
     Handler for completing an order.
 
     Works with text commands and inline buttons. Updates stats, level and achievements.
+    Errors are logged; a database error is also reported to the user.
 
     Args:
         message_or_query: Message or CallbackQuery
-
-    Raises:
-        Exception: On DB or send errors
     """
-    try:
-        if isinstance(message_or_query, CallbackQuery):
-            message = message_or_query.message
-            if message is None:
-                await message_or_query.answer()
-                return
-            from_user: User | None = message_or_query.from_user
-            chat = message.chat
-            await message_or_query.answer()
-        else:
-            message = message_or_query
-            from_user = message.from_user
-            chat = message.chat
-
-        if from_user is None or not isinstance(message, Message):
-            return
-        if CHAT_ID and str(chat.id) != str(CHAT_ID):
-            await message.answer(WRONG_CHAT)
-            return
+    unpacked = await _unpack(message_or_query)
+    if unpacked is None:
+        return
+    message, from_user = unpacked
 
+    try:
         async with get_db() as db_conn:
             db: aiosqlite.Connection = db_conn
-            user = await fetch_user(db, from_user.id, from_user.first_name or "")
-            active = await get_active_order(db, user["user_id"])
-            if not active:
-                name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-                await message.answer(
-                    NO_ACTIVE_ORDER.format(name=name_mention),
-                    reply_markup=main_menu_kb(),
+            user = await get_user(db, from_user.id)
+            active = await get_active_order(db, from_user.id) if user is not None else None
+            if active:
+                order_crosses = active["crosses"]
+                n_total, level_changed, new_title, total_crosses = await finish_order_and_level(
+                    db, from_user.id, active["tag"], order_crosses
                 )
-                return
-
-            order_crosses = sum(v for (_, v) in active["dishes"])
-            n_total, level_changed, new_title, total_crosses = await finish_order_and_level(
-                db, user["user_id"], active["tag"], order_crosses
-            )
-            await clear_active_order(db, user["user_id"])
+    except Exception:
+        logger.opt(exception=True).error("Error completing order for user {}", from_user.id)
+        await _send(message, "❌ Произошла ошибка при завершении заказа. Попробуйте позже.")
+        return
+
+    first_name = user["first_name"] if user is not None else from_user.first_name
+    name_mention = format_user_mention(from_user.id, first_name or "")
+    if not active:
+        await _send(message, NO_ACTIVE_ORDER.format(name=name_mention), reply_markup=MAIN_MENU_KB)
+        return
+
+    if level_changed:
+        txt = _format_done_level_up(
+            name=name_mention,
+            n=n_total,
+            title=new_title,
+            total_crosses=total_crosses,
+        )
+    else:
+        txt = _format_done(
+            name=name_mention,
+            n=n_total,
+            total_crosses=total_crosses,
+            title=new_title,
+        )
 
-            name_mention = format_user_mention(from_user.id, user.get("first_name") or "")
-            if level_changed:
-                txt = DONE_WITH_LEVEL_UP.format(
-                    name=name_mention,
-                    n=n_total,
-                    title=new_title,
-                    total_crosses=total_crosses,
-                )
-            else:
-                txt = DONE_ORDER.format(
-                    name=name_mention,
-                    n=n_total,
-                    total_crosses=total_crosses,
-                    title=new_title,
-                )
+    txt += _MILESTONE_BY_ORDERS.get(n_total, "")
 
-            if n_total == 40:
-                txt += GAME_COMPLETE
-            elif n_total == 100:
-                txt += TROPHY_GOLD
-            elif n_total == 200:
-                txt += TROPHY_DIAMOND
-
-            await message.answer(txt, reply_markup=main_menu_kb())
-    except Exception as e:
-        logger.error(
-            f"Error completing order for user {from_user.id if from_user is not None else '?'}: {e}"
-        )
-        try:
-            if isinstance(message, Message):
-                await message.answer(
-                    "❌ Произошла ошибка при завершении заказа. Попробуйте позже.",
-                )
-        except Exception:
-            pass
+    await _send(message, txt, reply_markup=MAIN_MENU_KB)
 
 
 @router.message(Command("done"))
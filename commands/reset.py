@@ -10,7 +10,7 @@ from aiogram.types import Message
 from loguru import logger
 
 from data.texts import ADMIN_ONLY, RESET_SUCCESS
-from database import get_db
+from database import clear_user_cache, get_db
 from utils import format_user_mention, is_admin
 
 router = Router()
@@ -32,7 +32,7 @@ async def cmd_reset(message: Message) -> None:
     if message.from_user is None:
         return
     try:
-        if not is_admin(str(message.from_user.id)):
+        if not is_admin(message.from_user.id):
             name_mention = format_user_mention(
                 message.from_user.id, message.from_user.first_name or ""
             )
@@ -41,16 +41,19 @@ async def cmd_reset(message: Message) -> None:
 
         async with get_db() as db_conn:
             db: aiosqlite.Connection = db_conn
+            # No WHERE clause and no triggers: SQLite drops the table pages in one go
             await db.execute("DELETE FROM users")
             await db.commit()
+            # The users are gone once committed: drop their cached rows right away
+            clear_user_cache()
         name_mention = format_user_mention(
             message.from_user.id, message.from_user.first_name or ""
         )
-        logger.warning(f"Admin {message.from_user.id} cleared the database")
+        logger.warning("Admin {} cleared the database", message.from_user.id)
         await message.answer(RESET_SUCCESS.format(name=name_mention))
-    except Exception as e:
+    except Exception:
         admin_id = message.from_user.id if message.from_user is not None else "?"
-        logger.error(f"Error resetting data by admin {admin_id}: {e}")
+        logger.opt(exception=True).error("Error resetting data by admin {}", admin_id)
         try:
             await message.answer(
                 "❌ Произошла ошибка при сбросе данных. Попробуйте позже.",
@@ -6,16 +6,16 @@ Greets users and automatically welcomes new chat members.
 from typing import cast
 
 import aiosqlite
-from aiogram import Router
+from aiogram import F, Router
 from aiogram.enums import ChatMemberStatus
 from aiogram.filters import CommandStart
-from aiogram.types import ChatMemberUpdated, Message, ReplyKeyboardRemove
+from aiogram.types import ChatMemberUpdated, Message
 from loguru import logger
 
-from config import CHAT_ID
-from data.texts import HELLO, SELECT_ACTION
+from config import CHAT_ID_INT
+from data.texts import WELCOME
 from database import _UserLike, ensure_user, get_db
-from keyboards.main_menu import main_menu_kb
+from keyboards.main_menu import MAIN_MENU_KB
 from utils import format_user_mention
 
 router = Router()
@@ -35,25 +35,20 @@ async def cmd_start(message: Message) -> None:
     Raises:
         Exception: On DB or send errors
     """
-    if message.from_user is None:
+    if message.from_user is None or message.from_user.is_bot:
         return
     try:
         async with get_db() as db_conn:
             db: aiosqlite.Connection = db_conn
             await ensure_user(db, cast(_UserLike, message.from_user))
 
-        keyboard = main_menu_kb()
         name_mention = format_user_mention(
             message.from_user.id, message.from_user.first_name or ""
         )
-        await message.answer(
-            HELLO.format(name=name_mention),
-            reply_markup=ReplyKeyboardRemove(),
-        )
-        await message.answer(SELECT_ACTION, reply_markup=keyboard)
-    except Exception as e:
+        await message.answer(WELCOME.format(name=name_mention), reply_markup=MAIN_MENU_KB)
+    except Exception:
         user_id = message.from_user.id if message.from_user is not None else "?"
-        logger.error(f"Error handling /start for user {user_id}: {e}")
+        logger.opt(exception=True).error("Error handling /start for user {}", user_id)
         try:
             await message.answer(
                 "❌ Произошла ошибка при запуске. Попробуйте позже.",
@@ -62,12 +57,19 @@ async def cmd_start(message: Message) -> None:
             pass
 
 
-@router.chat_member()
+@router.chat_member(
+    F.chat.id == CHAT_ID_INT,
+    F.old_chat_member.status != ChatMemberStatus.MEMBER,
+    F.new_chat_member.status == ChatMemberStatus.MEMBER,
+    ~F.new_chat_member.user.is_bot,
+)
 async def on_new_member(event: ChatMemberUpdated) -> None:
     """
     Handle new chat member join.
 
     Welcomes new members in the game chat, registers them and sends welcome message.
+    Other chats, other status changes and bots are filtered out by the router, so
+    the handler only runs for real joins.
 
     Args:
         event: Chat member update event
@@ -75,36 +77,19 @@ async def on_new_member(event: ChatMemberUpdated) -> None:
     Raises:
         Exception: On DB or send errors
     """
+    if event.bot is None:
+        return
+    new_member = event.new_chat_member.user
     try:
-        if not CHAT_ID or str(event.chat.id) != str(CHAT_ID):
-            return
-
-        old_status = event.old_chat_member.status
-        new_status = event.new_chat_member.status
-
-        if old_status != ChatMemberStatus.MEMBER and new_status == ChatMemberStatus.MEMBER:
-            new_member = event.new_chat_member.user
-
-            if new_member.is_bot:
-                return
-            if event.bot is None:
-                return
-
-            async with get_db() as db_conn:
-                db: aiosqlite.Connection = db_conn
-                await ensure_user(db, cast(_UserLike, new_member))
-
-            keyboard = main_menu_kb()
-            name_mention = format_user_mention(new_member.id, new_member.first_name or "")
-            await event.bot.send_message(
-                chat_id=event.chat.id,
-                text=HELLO.format(name=name_mention),
-                reply_markup=ReplyKeyboardRemove(),
-            )
-            await event.bot.send_message(
-                chat_id=event.chat.id, text=SELECT_ACTION, reply_markup=keyboard
-            )
-    except Exception as e:
-        new_user = event.new_chat_member.user
-        user_id = new_user.id if new_user is not None else "?"
-        logger.error(f"Error welcoming new member {user_id}: {e}")
+        async with get_db() as db_conn:
+            db: aiosqlite.Connection = db_conn
+            await ensure_user(db, cast(_UserLike, new_member))
+
+        name_mention = format_user_mention(new_member.id, new_member.first_name or "")
+        await event.bot.send_message(
+            chat_id=event.chat.id,
+            text=WELCOME.format(name=name_mention),
+            reply_markup=MAIN_MENU_KB,
+        )
+    except Exception:
+        logger.opt(exception=True).error("Error welcoming new member {}", new_member.id)
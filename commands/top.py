@@ -3,14 +3,16 @@ Handlers for stats commands (admins only).
 
 Full stats and top-10 players.
 """
+from string import Formatter
+
 import aiosqlite
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
 from loguru import logger
 
-from config import CHAT_ID
-from data.levels import LEVELS
+from config import CHAT_ID_INT
+from data.levels import LEVELS_TUPLE, MAX_LEVEL
 from data.texts import (
     ADMIN_ONLY,
     EMPTY_DB,
@@ -23,12 +25,123 @@ from data.texts import (
     TOP_DM_FAIL,
     TOP_SENT_DM,
 )
-from database import get_db
-from utils import format_user_mention, is_admin
+from database import get_db_ro
+from utils import escape_html, format_user_mention, is_admin
 
 router = Router()
 
 
+def _positional_template(template: str, fields: tuple[str, ...]) -> str:
+    """
+    Convert a str.format template with named fields into a %-template.
+
+    The template is parsed once here, so rendering is a plain % with a tuple.
+
+    Args:
+        template: Template with {field} placeholders (no format specs)
+        fields: Expected field names, in the order they appear
+
+    Returns:
+        Template with each field replaced by %s and literal % escaped
+
+    Raises:
+        ValueError: If the template fields differ from the expected ones
+    """
+    parts: list[str] = []
+    found: list[str] = []
+    for literal, field, _, _ in Formatter().parse(template):
+        parts.append(literal.replace("%", "%%"))
+        if field is not None:
+            parts.append("%s")
+            found.append(field)
+    if tuple(found) != fields:
+        raise ValueError(f"Template fields {found} do not match {list(fields)}")
+    return "".join(parts)
+
+
+# STATS_LINE rendered positionally once per player in /top
+_STATS_LINE = _positional_template(
+    STATS_LINE,
+    ("num", "name", "orders", "level", "student", "critic", "dirty", "chef"),
+)
+
+# TOP10_LINE rendered positionally as (medal, name, orders, level)
+_TOP10_LINE = _positional_template(TOP10_LINE, ("medal", "name", "orders", "level"))
+
+# Rank marks for /top10, one per row of the LIMIT 10 query
+_MEDALS = ("🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟")
+
+# Telegram message length limit, in UTF-16 code units
+_MESSAGE_LIMIT = 4096
+
+
+def _paginate(lines: list[str]) -> list[str]:
+    """
+    Join lines into as few messages as fit Telegram's length limit.
+
+    Args:
+        lines: Message lines (each well below the limit)
+
+    Returns:
+        Page texts, lines joined with newlines
+    """
+    pages: list[str] = []
+    page: list[str] = []
+    size = -1  # no newline before the first line
+    for line in lines:
+        line_size = len(line.encode("utf-16-le")) // 2 + 1
+        if page and size + line_size > _MESSAGE_LIMIT:
+            pages.append("\n".join(page))
+            page, size = [], -1
+        page.append(line)
+        size += line_size
+    if page:
+        pages.append("\n".join(page))
+    return pages
+
+
+def _level_title(level: int | None) -> str:
+    """
+    Title of a player's level, as shown in the ratings.
+
+    Args:
+        level: level column value; NULL in old rows counts as the default level 0
+
+    Returns:
+        Title from LEVELS_TUPLE, or the LEVEL_FALLBACK wording for levels missing from it
+    """
+    if level is None:
+        level = 0
+    if 0 <= level <= MAX_LEVEL:
+        return LEVELS_TUPLE[level]
+    return LEVEL_FALLBACK.format(level=level)
+
+
+# Queries kept as module constants: the same text on every call lets sqlite3's
+# per-connection statement cache hand back the already compiled statement.
+# total_orders may be NULL in old rows, hence the COALESCE (not aliased, so that
+# ORDER BY still names the indexed column).
+_TOP_FULL_SQL = """
+    SELECT first_name, level, COALESCE(total_orders, 0), has_student_done,
+           has_critic_done, has_dirty_plate_done, has_second_chef_done
+    FROM users
+    ORDER BY total_orders DESC, level DESC
+"""
+# ✅/❌ marks for the four event flags, indexed by the flags packed into 4 bits
+# (student, critic, dirty plate, second chef from high bit to low)
+_FLAG_MARKS = tuple(
+    tuple("✅" if bits >> shift & 1 else "❌" for shift in (3, 2, 1, 0))
+    for bits in range(16)
+)
+
+_TOP10_SQL = """
+    SELECT user_id, first_name, level, COALESCE(total_orders, 0)
+    FROM users
+    ORDER BY total_orders DESC, level DESC
+    LIMIT 10
+"""
+
+
 @router.message(Command("top"))
 async def cmd_top(message: Message) -> None:
     """
@@ -44,22 +157,16 @@ async def cmd_top(message: Message) -> None:
     """
     if message.from_user is None or message.bot is None:
         return
-    if not is_admin(str(message.from_user.id)):
+    if not is_admin(message.from_user.id):
         name_mention = format_user_mention(
             message.from_user.id, message.from_user.first_name or ""
         )
         await message.answer(ADMIN_ONLY.format(name=name_mention))
         return
 
-    async with get_db() as db_conn:
+    async with get_db_ro() as db_conn:
         db: aiosqlite.Connection = db_conn
-        cur = await db.execute("""
-            SELECT first_name, level, total_orders, has_student_done, has_critic_done,
-                   has_dirty_plate_done, has_second_chef_done
-            FROM users
-            ORDER BY total_orders DESC, level DESC
-        """)
-        rows = await cur.fetchall()
+        rows = await db.execute_fetchall(_TOP_FULL_SQL)
 
     admin_id = str(message.from_user.id)
 
@@ -77,26 +184,26 @@ async def cmd_top(message: Message) -> None:
         return
 
     lines = [STATS_HEADER]
-    for i, r in enumerate(rows, start=1):
-        level_title = LEVELS.get(r["level"], LEVEL_FALLBACK.format(level=r["level"]))
-        student = "✅" if r["has_student_done"] else "❌"
-        critic = "✅" if r["has_critic_done"] else "❌"
-        dirty = "✅" if r["has_dirty_plate_done"] else "❌"
-        chef = "✅" if r["has_second_chef_done"] else "❌"
-        lines.append(STATS_LINE.format(
-            num=i,
-            name=r["first_name"] or "",
-            orders=r["total_orders"],
-            level=level_title,
-            student=student,
-            critic=critic,
-            dirty=dirty,
-            chef=chef
-        ))
-    text = "\n".join(lines)
+    # Rows unpack positionally in _TOP_FULL_SQL column order
+    lines.extend([
+        _STATS_LINE % (
+            i,
+            escape_html(first_name or ""),
+            total_orders,
+            _level_title(level),
+            *_FLAG_MARKS[
+                bool(student) << 3 | bool(critic) << 2 | bool(dirty) << 1 | bool(chef)
+            ],
+        )
+        for i, (
+            first_name, level, total_orders, student, critic, dirty, chef
+        ) in enumerate(rows, start=1)
+    ])
 
     try:
-        await message.bot.send_message(chat_id=admin_id, text=text)
+        # Large player lists are split over several messages instead of hitting the limit
+        for page in _paginate(lines):
+            await message.bot.send_message(chat_id=admin_id, text=page)
         if message.chat.type != "private":
             await message.answer(TOP_SENT_DM)
     except Exception:
@@ -123,50 +230,40 @@ async def cmd_top10(message: Message) -> None:
     if message.from_user is None:
         return
     try:
-        if not is_admin(str(message.from_user.id)):
+        if not is_admin(message.from_user.id):
             name_mention = format_user_mention(
                 message.from_user.id, message.from_user.first_name or ""
             )
             await message.answer(ADMIN_ONLY.format(name=name_mention))
             return
 
-        if CHAT_ID and str(message.chat.id) != str(CHAT_ID):
+        if CHAT_ID_INT is not None and message.chat.id != CHAT_ID_INT:
             return
 
-        async with get_db() as db_conn:
+        async with get_db_ro() as db_conn:
             db: aiosqlite.Connection = db_conn
-            cur = await db.execute(
-                """
-                SELECT user_id, first_name, level, total_orders
-                FROM users
-                ORDER BY total_orders DESC, level DESC
-                LIMIT 10
-            """
-            )
-            rows = await cur.fetchall()
+            rows = await db.execute_fetchall(_TOP10_SQL)
 
         if not rows:
             await message.answer(NO_PLAYERS_IN_RATING)
             return
 
         lines = [TOP10_HEADER]
-        medals = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
-
-        for i, r in enumerate(rows):
-            level_title = LEVELS.get(r["level"], LEVEL_FALLBACK.format(level=r["level"]))
-            medal = medals[i] if i < len(medals) else f"{i+1}."
-            name_mention = format_user_mention(r["user_id"], r["first_name"] or "")
-            lines.append(
-                TOP10_LINE.format(
-                    medal=medal, name=name_mention, orders=r["total_orders"], level=level_title
-                )
+        lines.extend([
+            _TOP10_LINE % (
+                _MEDALS[i],
+                format_user_mention(user_id, first_name or ""),
+                total_orders,
+                _level_title(level),
             )
+            for i, (user_id, first_name, level, total_orders) in enumerate(rows)
+        ])
 
         text = "\n".join(lines)
         await message.answer(text)
-    except Exception as e:
+    except Exception:
         user_id = message.from_user.id if message.from_user is not None else "?"
-        logger.error(f"Error fetching top-10 for user {user_id}: {e}")
+        logger.opt(exception=True).error("Error fetching top-10 for user {}", user_id)
         try:
             await message.answer(
                 "❌ Произошла ошибка при получении рейтинга. Попробуйте позже.",
@@ -13,14 +13,38 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 
 # Game chat ID where the bot operates
-CHAT_ID = os.getenv("CHAT_ID", "")
+CHAT_ID = os.getenv("CHAT_ID", "").strip()
+
+# A set CHAT_ID must be a numeric chat ID (group IDs are negative); anything else
+# (such as the env.example placeholder) is a configuration error
+if CHAT_ID and not CHAT_ID.removeprefix("-").isdigit():
+    raise RuntimeError(f"CHAT_ID must be a numeric Telegram chat ID, got {CHAT_ID!r}. Fix .env")
+
+# Game chat ID as an int to compare with chat.id directly (None when unset)
+CHAT_ID_INT = int(CHAT_ID) if CHAT_ID else None
 
 # Comma-separated admin IDs (e.g. "123,456")
 ADMIN_IDS_STR = os.getenv("ADMIN_ID", "")
 
-# List of admin IDs (parsed from ADMIN_IDS_STR)
-ADMIN_IDS = (
-    [aid.strip() for aid in ADMIN_IDS_STR.split(",") if aid.strip()]
-    if ADMIN_IDS_STR
-    else []
+# Set of admin IDs (parsed from ADMIN_IDS_STR) as ints, matching from_user.id;
+# entries that are not numeric IDs are skipped
+ADMIN_IDS: frozenset[int] = frozenset(
+    int(aid) for aid in (part.strip() for part in ADMIN_IDS_STR.split(",")) if aid.isdigit()
 )
+
+# Debug mode: verbose console log and tracebacks with local variable values
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+
+# Maximum number of updates handled at the same time
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))
+
+# Public HTTPS URL Telegram posts updates to; when unset the bot uses long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+
+# Secret Telegram sends with every webhook request (optional, recommended;
+# 1-256 characters from A-Z, a-z, 0-9, _ and -)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Address the webhook server listens on (behind the proxy serving WEBHOOK_URL)
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
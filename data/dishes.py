@@ -1,7 +1,9 @@
 # data/dishes.py
-# Menu by level (dishes and cross counts)
+from itertools import chain
+
+# Menu by level (dishes and cross counts); tuples, since the menu never changes
 DISHES_BY_LEVEL = {
-    0: [
+    0: (
         ("☕️ Эспрессо", 70),
         ("🍩 Пончик с глазурью", 75),
         ("🥪 Тост с ветчиной", 60),
@@ -10,8 +12,8 @@ DISHES_BY_LEVEL = {
         ("🥐 Круассан", 45),
         ("🧃 Яблочный сок", 65),
         ("🍺 Пиво", 90),
-    ],
-    1: [
+    ),
+    1: (
         ("🍝 Паста карбонара", 150),
         ("🍔 Гамбургер", 160),
         ("🍟 Картошка фри", 145),
@@ -19,18 +21,24 @@ DISHES_BY_LEVEL = {
         ("🌭 Хот-дог", 135),
         ("🍕 Пицца «Пепперони»", 170),
         ("🍷 Вино", 180),
-    ],
-    2: [
+    ),
+    2: (
         ("🍸 Мартини", 200),
         ("🥗 Цезарь с курицей", 210),
         ("🍤 Креветки темпура", 205),
         ("🍣 Филадельфия", 220),
-    ],
-    3: [
+    ),
+    3: (
         ("🫖 Облепиховый чай", 300),
         ("🍱 Сет суши", 310),
         ("🥩 Стейк", 350),
-    ],
+    ),
+}
+
+# Dishes unlocked at each level (levels 0..lv combined), built once at import
+OPENED_BY_LEVEL = {
+    lv: tuple(chain.from_iterable(DISHES_BY_LEVEL.get(i, ()) for i in range(lv + 1)))
+    for lv in DISHES_BY_LEVEL
 }
 
 # Special orders are in data/special_orders.py
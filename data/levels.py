@@ -8,3 +8,6 @@ LEVELS = {
 }
 ORDERS_PER_LEVEL = 10  # Level up every 10 orders
 MAX_LEVEL = max(LEVELS.keys())
+
+# Level titles indexed by level (0..MAX_LEVEL); LEVELS keys are contiguous
+LEVELS_TUPLE = tuple(LEVELS[lv] for lv in range(MAX_LEVEL + 1))
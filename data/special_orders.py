@@ -4,7 +4,9 @@ Special order events.
 Game events (student, critic, dirty plate, second chef) with probabilities and messages.
 """
 import random
-from typing import cast
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, cast
 
 from data.texts import (
     CRITIC_APPEAR,
@@ -50,35 +52,66 @@ SPECIAL_ORDERS = {
     },
 }
 
+# Private generator for event rolls, independent of other users of the random module;
+# its random() is bound once for the roll loop
+_rng = random.Random()
+_roll = _rng.random
+
+
+@dataclass(slots=True, frozen=True)
+class SpecialOrderSpec:
+    """Trigger rules of one special order, unpacked from SPECIAL_ORDERS."""
+
+    tag: str
+    min_idx: int
+    max_idx: int
+    flag_name: str
+    prob: float
+    config: dict
+
+
+_SPECIAL_SPECS = tuple(
+    SpecialOrderSpec(
+        tag=tag,
+        min_idx=cast(int, cfg["min_order_index"]),
+        max_idx=cast(int, cfg["max_order_index"]),
+        flag_name=cast(str, cfg["user_flag"]),
+        prob=cast(float, cfg["probability"]),
+        config=cfg,
+    )
+    for tag, cfg in SPECIAL_ORDERS.items()
+)
+
+_MAX_SPECIAL_INDEX = max(spec.max_idx for spec in _SPECIAL_SPECS)
+
+# Events whose order index range covers a given index, keyed by index (1-based)
+_SPECIALS_BY_INDEX: dict[int, tuple[SpecialOrderSpec, ...]] = {
+    idx: tuple(spec for spec in _SPECIAL_SPECS if spec.min_idx <= idx <= spec.max_idx)
+    for idx in range(1, _MAX_SPECIAL_INDEX + 1)
+}
+
+
 def check_special_order(
-    order_index: int, user_flags: dict
+    order_index: int, user: Mapping[str, Any]
 ) -> tuple[str, dict] | None:
     """
     Check whether a special order should be triggered.
 
-    For each event: order index range, user flag (not done yet), then probability.
+    Events whose order index range covers the index are looked up in a precomputed
+    table; for each of them: user flag (not done yet), then probability.
 
     Args:
         order_index: Current order number (1-based)
-        user_flags: User flags (has_student_done, has_critic_done, etc.)
+        user: User data with the event flags (has_student_done, has_critic_done, etc.)
 
     Returns:
         (tag, order_config) if special order triggered, else None.
     """
-    for tag, order_config in SPECIAL_ORDERS.items():
-        min_idx = cast(int | None, order_config.get("min_order_index"))
-        max_idx = order_config.get("max_order_index")
-        if min_idx is not None and order_index < min_idx:
-            continue
-        if max_idx is not None and order_index > cast(int, max_idx):
-            continue
-
-        flag_name = cast(str, order_config["user_flag"])
-        if user_flags.get(flag_name, 0):
+    for spec in _SPECIALS_BY_INDEX.get(order_index, ()):
+        if user.get(spec.flag_name, 0):
             continue
 
-        prob = cast(float, order_config["probability"])
-        if random.random() < prob:
-            return tag, order_config
+        if _roll() < spec.prob:
+            return spec.tag, spec.config
 
     return None
@@ -80,6 +80,8 @@ ADMIN_ONLY = "🔒 {name}, эта команда доступна только 
 
 # Additional UI texts
 SELECT_ACTION = "Выберите действие:"
+# Greeting and menu prompt sent as one message
+WELCOME = HELLO + "\n\n" + SELECT_ACTION
 NEW_ORDER_MESSAGE = "👩‍🍳 {name}, вот твой заказ #{order_number}:\n\n{dishes}"
 DISH_LINE = "{name} — {crosses} крестиков"
 RESET_SUCCESS = "🧹 {name}, все данные очищены. Игра начинается заново!"
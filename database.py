@@ -3,17 +3,82 @@ SQLite database module.
 
 Provides functions for users, orders and game statistics.
 """
-import json
+import asyncio
+from collections import OrderedDict
+from collections.abc import Mapping
 from contextlib import asynccontextmanager
+from pathlib import Path
+from types import MappingProxyType
 from typing import Any, Protocol, cast, runtime_checkable
 
 import aiosqlite
+import orjson
 from loguru import logger
 
-from data.levels import LEVELS, MAX_LEVEL, ORDERS_PER_LEVEL
+from data.levels import LEVELS_TUPLE, MAX_LEVEL, ORDERS_PER_LEVEL
+from data.texts import LEVEL_FALLBACK
 
 DB_PATH = "data/cafe.db"
 
+# Schema version stored in PRAGMA user_version; bump it with each new step in migrate()
+SCHEMA_VERSION = 1
+
+# Connection tuning: WAL lets readers run alongside the writer, NORMAL sync fsyncs
+# only on checkpoints, busy_timeout waits for locks instead of failing immediately
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Statements used per request. Fixed text keeps every call on the same entry of
+# sqlite3's per-connection statement cache, so each is compiled once.
+_SQL_INSERT_USER = "INSERT OR IGNORE INTO users (user_id, first_name) VALUES (?, ?)"
+# Columns of the cached user row: only what handlers and special orders read. The
+# order columns stay, since load_order_context decodes both orders from this row.
+_USER_COLUMNS = (
+    "user_id, first_name, level, total_orders, has_student_done, has_dirty_plate_done, "
+    "has_critic_done, has_second_chef_done, last_order_json, active_order_json"
+)
+_SQL_SELECT_USER = f"SELECT {_USER_COLUMNS} FROM users WHERE user_id = ?"
+# Creates the user if missing and returns the row either way; the no-op DO UPDATE
+# makes RETURNING report existing rows too
+_SQL_UPSERT_USER = (
+    "INSERT INTO users (user_id, first_name) VALUES (?, ?) "
+    f"ON CONFLICT(user_id) DO UPDATE SET first_name=first_name RETURNING {_USER_COLUMNS}"
+)
+_SQL_UPDATE_ACTIVE = "UPDATE users SET active_order_json=? WHERE user_id=?"
+_SQL_SELECT_ACTIVE = "SELECT active_order_json FROM users WHERE user_id=?"
+_SQL_FINISH_SELECT = "SELECT level, active_order_json FROM users WHERE user_id=?"
+# Completes an order in one statement: counters, level-up, event flags and last order
+# are all computed from the current row; RETURNING hands back the new values
+_SQL_FINISH_UPDATE = """
+    UPDATE users SET
+        total_orders = COALESCE(total_orders, 0) + 1,
+        total_crosses = COALESCE(total_crosses, 0) + :crosses,
+        level = CASE
+            WHEN (COALESCE(total_orders, 0) + 1) % :per_level = 0
+                 AND COALESCE(level, 0) < :max_level
+            THEN COALESCE(level, 0) + 1
+            ELSE COALESCE(level, 0)
+        END,
+        has_student_done = COALESCE(has_student_done, 0) | :student,
+        has_dirty_plate_done = COALESCE(has_dirty_plate_done, 0) | :dirty_plate,
+        has_critic_done = COALESCE(has_critic_done, 0) | :critic,
+        has_second_chef_done = COALESCE(has_second_chef_done, 0) | :second_chef,
+        last_order_json = COALESCE(:last_order, last_order_json),
+        active_order_json = NULL
+    WHERE user_id = :user_id
+    RETURNING total_orders, total_crosses, level, has_student_done, has_dirty_plate_done,
+              has_critic_done, has_second_chef_done, last_order_json, active_order_json
+"""
+# :student/:dirty_plate/:critic/:second_chef parameters of _SQL_FINISH_UPDATE per
+# special order tag; regular orders (and unknown tags) set no flag
+_NO_TAG_FLAGS = {"student": 0, "dirty_plate": 0, "critic": 0, "second_chef": 0}
+_TAG_FLAGS = {tag: {**_NO_TAG_FLAGS, tag: 1} for tag in _NO_TAG_FLAGS}
+
 
 @runtime_checkable
 class _UserLike(Protocol):
@@ -22,13 +87,50 @@ class _UserLike(Protocol):
     first_name: str | None
 
 
-class _FakeUser:
-    """Minimal user-like object for ensure_user in fetch_user."""
-    __slots__ = ("id", "first_name")
+_db: aiosqlite.Connection | None = None
+_db_lock = asyncio.Lock()
+
+# Read-only connections for reports (/top, /top10): under WAL they read a committed
+# snapshot without waiting for the writer lock. Opened on demand, kept idle for reuse.
+_READER_COUNT = 2
+_idle_readers: list[aiosqlite.Connection] = []
+_readers_sem = asyncio.Semaphore(_READER_COUNT)
+
+# PRAGMAs that matter for a read-only connection (journal settings belong to the writer)
+_READER_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Write-through cache of user rows returned by fetch_user. All writes to users go
+# through this module and update the cached row after commit, so it never goes stale
+# (the bot runs as a single process). Bounded: the least recently used rows are
+# dropped past _USER_CACHE_SIZE and simply read again on the next request.
+_USER_CACHE_SIZE = 4096
+_user_cache: OrderedDict[int, dict[str, Any]] = OrderedDict()
 
-    def __init__(self, user_id: int, first_name: str | None = None) -> None:
-        self.id = user_id
-        self.first_name = first_name
+
+async def _connect() -> aiosqlite.Connection:
+    """
+    Open a tuned database connection and run migrations.
+
+    Returns:
+        aiosqlite.Connection: Ready-to-use connection
+
+    Raises:
+        aiosqlite.Error: On connection or migration errors
+    """
+    db = await aiosqlite.connect(DB_PATH)
+    try:
+        db.row_factory = aiosqlite.Row
+        for pragma in _PRAGMAS:
+            await db.execute(pragma)
+        await migrate(db)
+    except aiosqlite.Error:
+        await db.close()
+        raise
+    return db
 
 
 @asynccontextmanager
@@ -36,7 +138,10 @@ async def get_db():
     """
     Context manager for database access.
 
-    Creates a connection, runs migrations and closes it on exit.
+    Yields the shared connection, opening it (PRAGMA tuning and migrations included)
+    on first use. Access is serialized with a lock so that statements of concurrent
+    handlers never end up in the same transaction; an unfinished transaction is
+    rolled back if the block fails.
 
     Yields:
         aiosqlite.Connection: Database connection
@@ -44,25 +149,150 @@ async def get_db():
     Raises:
         aiosqlite.Error: On connection errors
     """
-    db = None
+    global _db
+    async with _db_lock:
+        try:
+            if _db is None:
+                _db = await _connect()
+            db = _db
+            try:
+                yield db
+            except BaseException:
+                if db.in_transaction:
+                    await db.rollback()
+                raise
+        except aiosqlite.Error as e:
+            logger.error("Database error: {}", e)
+            raise
+
+
+async def _connect_reader() -> aiosqlite.Connection:
+    """
+    Open a read-only connection to the database file.
+
+    Returns:
+        aiosqlite.Connection: Read-only connection
+
+    Raises:
+        aiosqlite.Error: On connection errors
+    """
+    uri = f"{Path(DB_PATH).resolve().as_uri()}?mode=ro"
+    db = await aiosqlite.connect(uri, uri=True)
     try:
-        db = await aiosqlite.connect(DB_PATH)
         db.row_factory = aiosqlite.Row
-        await migrate(db)
-        yield db
-    except aiosqlite.Error as e:
-        logger.error(f"Database error: {e}")
+        for pragma in _READER_PRAGMAS:
+            await db.execute(pragma)
+    except aiosqlite.Error:
+        await db.close()
         raise
-    finally:
-        if db:
-            await db.close()
+    return db
+
+
+@asynccontextmanager
+async def get_db_ro():
+    """
+    Context manager for read-only database access.
+
+    For report queries that don't touch the user cache. Up to _READER_COUNT
+    readers run at once, next to the writer connection of get_db(). The writer
+    is opened first, so the database file exists and is migrated.
+
+    Yields:
+        aiosqlite.Connection: Read-only database connection
+
+    Raises:
+        aiosqlite.Error: On connection errors
+    """
+    async with _readers_sem:
+        if _db is None:
+            async with get_db():
+                pass
+        try:
+            db = _idle_readers.pop() if _idle_readers else await _connect_reader()
+        except aiosqlite.Error as e:
+            logger.error("Database error: {}", e)
+            raise
+        try:
+            yield db
+        finally:
+            _idle_readers.append(db)
+
+
+async def close_db() -> None:
+    """
+    Close the shared database connections (called on bot shutdown).
+    """
+    global _db
+    while _idle_readers:
+        await _idle_readers.pop().close()
+    async with _db_lock:
+        if _db is not None:
+            await _db.close()
+            _db = None
+
+
+def _cached_user(user_id: int) -> Mapping[str, Any] | None:
+    """
+    Look up a cached user row and mark it as recently used.
+
+    Args:
+        user_id: Telegram user ID
+
+    Returns:
+        Read-only view of the cached row, or None if the user is not cached
+    """
+    cached = _user_cache.get(user_id)
+    if cached is None:
+        return None
+    _user_cache.move_to_end(user_id)
+    return MappingProxyType(cached)
+
+
+def _cache_user(user_id: int, user: dict[str, Any]) -> Mapping[str, Any]:
+    """
+    Cache a user row read from the database, evicting the least recently used one.
+
+    Args:
+        user_id: Telegram user ID
+        user: Column values of the users row
+
+    Returns:
+        Read-only view of the cached row
+    """
+    _user_cache[user_id] = user
+    _user_cache.move_to_end(user_id)
+    if len(_user_cache) > _USER_CACHE_SIZE:
+        _user_cache.popitem(last=False)
+    return MappingProxyType(user)
+
+
+def _update_cached_user(user_id: int, **fields: Any) -> None:
+    """
+    Apply committed column values to the cached user row, if the user is cached.
+
+    Args:
+        user_id: Telegram user ID
+        **fields: Column values written to the users table
+    """
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        cached.update(fields)
+
+
+def clear_user_cache() -> None:
+    """
+    Drop all cached user rows (after bulk changes such as a full reset).
+    """
+    _user_cache.clear()
 
 
 async def migrate(db: aiosqlite.Connection) -> None:
     """
     Run database migrations.
 
-    Creates users table if missing and adds new columns when needed.
+    Creates users table if missing and adds new columns when needed. The applied
+    schema version is kept in PRAGMA user_version, so an up-to-date database costs
+    a single PRAGMA read.
 
     Args:
         db: Database connection
@@ -71,45 +301,108 @@ async def migrate(db: aiosqlite.Connection) -> None:
         aiosqlite.Error: On SQL execution errors
     """
     try:
-        await db.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                first_name TEXT,
-                level INTEGER DEFAULT 0,
-                total_orders INTEGER DEFAULT 0,
-                total_crosses INTEGER DEFAULT 0,
-                has_student_done INTEGER DEFAULT 0,
-                has_dirty_plate_done INTEGER DEFAULT 0,
-                has_critic_done INTEGER DEFAULT 0,
-                has_second_chef_done INTEGER DEFAULT 0,
-                next_order_half INTEGER DEFAULT 0,
-                last_order_json TEXT,
-                active_order_json TEXT
-            );
-            """
-        )
-        # Migration: add new columns if missing
-        migrations = [
-            "ALTER TABLE users ADD COLUMN total_crosses INTEGER DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN has_dirty_plate_done INTEGER DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN has_critic_done INTEGER DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN has_second_chef_done INTEGER DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN next_order_half INTEGER DEFAULT 0",
-            "ALTER TABLE users ADD COLUMN last_order_json TEXT",
-        ]
-        for migration in migrations:
-            try:
-                await db.execute(migration)
-            except aiosqlite.OperationalError:
-                # Column already exists
-                pass
+        cur = await db.execute("PRAGMA user_version")
+        row = await cur.fetchone()
+        version = row[0] if row else 0
+        if version >= SCHEMA_VERSION:
+            return
+
+        await db.execute("BEGIN")
+        if version < 1:
+            # Version 1: the users table with every column added so far. Databases
+            # created before versioning may lack some columns, hence the ALTERs.
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    first_name TEXT,
+                    level INTEGER DEFAULT 0,
+                    total_orders INTEGER DEFAULT 0,
+                    total_crosses INTEGER DEFAULT 0,
+                    has_student_done INTEGER DEFAULT 0,
+                    has_dirty_plate_done INTEGER DEFAULT 0,
+                    has_critic_done INTEGER DEFAULT 0,
+                    has_second_chef_done INTEGER DEFAULT 0,
+                    next_order_half INTEGER DEFAULT 0,
+                    last_order_json TEXT,
+                    active_order_json TEXT
+                );
+                """
+            )
+            migrations = [
+                "ALTER TABLE users ADD COLUMN total_crosses INTEGER DEFAULT 0",
+                "ALTER TABLE users ADD COLUMN has_dirty_plate_done INTEGER DEFAULT 0",
+                "ALTER TABLE users ADD COLUMN has_critic_done INTEGER DEFAULT 0",
+                "ALTER TABLE users ADD COLUMN has_second_chef_done INTEGER DEFAULT 0",
+                "ALTER TABLE users ADD COLUMN next_order_half INTEGER DEFAULT 0",
+                "ALTER TABLE users ADD COLUMN last_order_json TEXT",
+            ]
+            for migration in migrations:
+                try:
+                    await db.execute(migration)
+                except aiosqlite.OperationalError:
+                    # Column already exists
+                    pass
+            # Rating order for /top and /top10; first_name makes it covering for the top-10
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_users_rank "
+                "ON users (total_orders DESC, level DESC, first_name)"
+            )
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         await db.commit()
     except aiosqlite.Error as e:
-        logger.error(f"Migration error: {e}")
+        logger.error("Migration error: {}", e)
+        if db.in_transaction:
+            await db.rollback()
         raise
 
 
+def _parse_active_order(raw: str | bytes | None) -> dict[str, Any] | None:
+    """
+    Decode a stored active order.
+
+    Args:
+        raw: active_order_json column value (orjson BLOB, or JSON text in older rows)
+
+    Returns:
+        Order dict {"dishes": [...], "crosses": ..., "tag": ...} or None
+
+    Raises:
+        orjson.JSONDecodeError: On deserialization error
+    """
+    if not raw:
+        return None
+    payload = orjson.loads(raw)
+    dishes = payload.get("dishes", [])
+    crosses = payload.get("crosses")
+    if crosses is None:
+        # Orders saved before the total was stored
+        crosses = sum(v for (_, v) in dishes)
+    return {
+        "dishes": dishes,
+        "crosses": crosses,
+        "tag": payload.get("tag"),
+    }
+
+
+def _parse_last_order(raw: str | bytes | None) -> dict[str, Any] | None:
+    """
+    Decode a stored last completed order.
+
+    Args:
+        raw: last_order_json column value (orjson BLOB, or JSON text in older rows)
+
+    Returns:
+        Last order dict or None
+
+    Raises:
+        orjson.JSONDecodeError: On deserialization error
+    """
+    if not raw:
+        return None
+    return cast(dict[str, Any], orjson.loads(raw))
+
+
 async def ensure_user(db: aiosqlite.Connection, from_user: _UserLike) -> None:
     """
     Create user in database if not exists.
@@ -122,21 +415,21 @@ async def ensure_user(db: aiosqlite.Connection, from_user: _UserLike) -> None:
         aiosqlite.Error: On SQL execution error
     """
     try:
-        await db.execute(
-            "INSERT OR IGNORE INTO users (user_id, first_name) VALUES (?, ?)",
-            (from_user.id, from_user.first_name or "Guest"),
-        )
+        await db.execute(_SQL_INSERT_USER, (from_user.id, from_user.first_name or "Guest"))
         await db.commit()
     except aiosqlite.Error as e:
-        logger.error(f"Error creating user {from_user.id}: {e}")
+        logger.error("Error creating user {}: {}", from_user.id, e)
         raise
 
 
-async def fetch_user(db: aiosqlite.Connection, user_id: int, first_name: str) -> dict[str, Any]:
+async def fetch_user(
+    db: aiosqlite.Connection, user_id: int, first_name: str
+) -> Mapping[str, Any]:
     """
     Fetch user data from database.
 
-    Creates the user automatically if not found.
+    Creates the user automatically if not found, in the same statement that reads
+    the row. Served from the in-memory cache after the first call for a user.
 
     Args:
         db: Database connection
@@ -144,156 +437,148 @@ async def fetch_user(db: aiosqlite.Connection, user_id: int, first_name: str) ->
         first_name: User first name
 
     Returns:
-        User data dict
+        User data (read-only mapping of column values)
 
     Raises:
         aiosqlite.Error: On SQL execution error
     """
+    cached = _cached_user(user_id)
+    if cached is not None:
+        return cached
     try:
-        await ensure_user(db, _FakeUser(user_id=user_id, first_name=first_name))
-        cur = await db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-        row = await cur.fetchone()
-        if not row:
-            raise ValueError(f"User {user_id} not found after create")
-        return dict(row)
+        rows = await db.execute_fetchall(_SQL_UPSERT_USER, (user_id, first_name or "Guest"))
+        await db.commit()
     except aiosqlite.Error as e:
-        logger.error(f"Error fetching user {user_id}: {e}")
+        logger.error("Error fetching user {}: {}", user_id, e)
         raise
+    return _cache_user(user_id, dict(next(iter(rows))))
 
 
-async def save_active_order(
-    db: aiosqlite.Connection, user_id: int, dishes: list[tuple[str, int]], tag: str | None
-) -> None:
+async def get_user(db: aiosqlite.Connection, user_id: int) -> Mapping[str, Any] | None:
     """
-    Save user's active order to database.
+    Fetch user data without creating the user.
 
-    Args:
-        db: Database connection
-        user_id: Telegram user ID
-        dishes: List of (dish_name, crosses) tuples
-        tag: Special order tag ("critic", "student", "dirty_plate", None)
-
-    Raises:
-        aiosqlite.Error: On SQL execution error
-        TypeError: On serialization error (non-JSON-serializable value)
-    """
-    try:
-        payload = {"dishes": dishes, "tag": tag}
-        await db.execute(
-            "UPDATE users SET active_order_json=? WHERE user_id=?",
-            (json.dumps(payload, ensure_ascii=False), user_id),
-        )
-        await db.commit()
-    except (aiosqlite.Error, TypeError) as e:
-        logger.error(f"Error saving active order for user {user_id}: {e}")
-        raise
-
-
-async def get_active_order(db: aiosqlite.Connection, user_id: int) -> dict[str, Any] | None:
-    """
-    Get user's active order from database.
+    For read paths that have nothing to do for an unknown user. Served from the
+    in-memory cache after the first call for a user.
 
     Args:
         db: Database connection
         user_id: Telegram user ID
 
     Returns:
-        Order dict {"dishes": [...], "tag": ...} or None
+        User data (read-only mapping of column values) or None if the user is not
+        registered
 
     Raises:
         aiosqlite.Error: On SQL execution error
-        json.JSONDecodeError: On deserialization error
     """
+    cached = _cached_user(user_id)
+    if cached is not None:
+        return cached
     try:
-        cur = await db.execute("SELECT active_order_json FROM users WHERE user_id=?", (user_id,))
+        cur = await db.execute(_SQL_SELECT_USER, (user_id,))
         row = await cur.fetchone()
-        if not row or not row["active_order_json"]:
-            return None
-        payload = json.loads(row["active_order_json"])
-        return {
-            "dishes": payload.get("dishes", []),
-            "tag": payload.get("tag"),
-        }
-    except (aiosqlite.Error, json.JSONDecodeError) as e:
-        logger.error(f"Error getting active order for user {user_id}: {e}")
+    except aiosqlite.Error as e:
+        logger.error("Error fetching user {}: {}", user_id, e)
         raise
+    if row is None:
+        return None
+    return _cache_user(user_id, dict(row))
 
 
-async def clear_active_order(db: aiosqlite.Connection, user_id: int) -> None:
+async def load_order_context(
+    db: aiosqlite.Connection, user_id: int, first_name: str
+) -> tuple[Mapping[str, Any], dict[str, Any] | None, dict[str, Any] | None]:
     """
-    Clear user's active order.
+    Fetch user data together with the active and last orders.
+
+    Both orders are decoded from the user row itself, so the whole context costs
+    one SELECT instead of three.
 
     Args:
         db: Database connection
         user_id: Telegram user ID
+        first_name: User first name
+
+    Returns:
+        Tuple (user, active_order, last_order); orders are None when absent
 
     Raises:
         aiosqlite.Error: On SQL execution error
+        orjson.JSONDecodeError: On deserialization error
     """
+    user = await fetch_user(db, user_id, first_name)
     try:
-        await db.execute("UPDATE users SET active_order_json=NULL WHERE user_id=?", (user_id,))
-        await db.commit()
-    except aiosqlite.Error as e:
-        logger.error(f"Error clearing active order for user {user_id}: {e}")
+        active = _parse_active_order(user["active_order_json"])
+        last = _parse_last_order(user["last_order_json"])
+    except orjson.JSONDecodeError as e:
+        logger.error("Error decoding orders for user {}: {}", user_id, e)
         raise
+    return user, active, last
 
 
-async def save_last_order(
+async def save_active_order(
     db: aiosqlite.Connection,
     user_id: int,
     dishes: list[tuple[str, int]],
+    tag: str | None,
     order_crosses: int,
-    tag: str | None = None,
 ) -> None:
     """
-    Save last completed order (for "dirty plate" event).
+    Save user's active order to database.
+
+    The crosses total is stored with the dishes so readers don't have to sum them.
+    The payload is kept as the raw orjson bytes (a BLOB), with no text decoding on
+    either side.
 
     Args:
         db: Database connection
         user_id: Telegram user ID
         dishes: List of (dish_name, crosses) tuples
+        tag: Special order tag ("critic", "student", "dirty_plate", None)
         order_crosses: Total crosses in order
-        tag: Special order tag (optional)
 
     Raises:
         aiosqlite.Error: On SQL execution error
-        TypeError: On serialization error
+        TypeError: On serialization error (non-JSON-serializable value)
     """
     try:
         payload = {"dishes": dishes, "crosses": order_crosses, "tag": tag}
-        await db.execute(
-            "UPDATE users SET last_order_json=? WHERE user_id=?",
-            (json.dumps(payload, ensure_ascii=False), user_id),
-        )
+        active_order_json = orjson.dumps(payload)
+        await db.execute(_SQL_UPDATE_ACTIVE, (active_order_json, user_id))
         await db.commit()
+        _update_cached_user(user_id, active_order_json=active_order_json)
     except (aiosqlite.Error, TypeError) as e:
-        logger.error(f"Error saving last order for user {user_id}: {e}")
+        logger.error("Error saving active order for user {}: {}", user_id, e)
         raise
 
 
-async def get_last_order(db: aiosqlite.Connection, user_id: int) -> dict[str, Any] | None:
+async def get_active_order(db: aiosqlite.Connection, user_id: int) -> dict[str, Any] | None:
     """
-    Get user's last completed order.
+    Get user's active order from database.
 
     Args:
         db: Database connection
         user_id: Telegram user ID
 
     Returns:
-        Last order dict or None
+        Order dict {"dishes": [...], "crosses": ..., "tag": ...} or None
 
     Raises:
         aiosqlite.Error: On SQL execution error
-        json.JSONDecodeError: On deserialization error
+        orjson.JSONDecodeError: On deserialization error
     """
     try:
-        cur = await db.execute("SELECT last_order_json FROM users WHERE user_id=?", (user_id,))
+        cached = _cached_user(user_id)
+        if cached is not None:
+            return _parse_active_order(cached["active_order_json"])
+        cur = await db.execute(_SQL_SELECT_ACTIVE, (user_id,))
         row = await cur.fetchone()
-        if not row or not row["last_order_json"]:
+        if not row:
             return None
-        return cast(dict[str, Any], json.loads(row["last_order_json"]))
-    except (aiosqlite.Error, json.JSONDecodeError) as e:
-        logger.error(f"Error getting last order for user {user_id}: {e}")
+        return _parse_active_order(row["active_order_json"])
+    except (aiosqlite.Error, orjson.JSONDecodeError) as e:
+        logger.error("Error getting active order for user {}: {}", user_id, e)
         raise
 
 
@@ -316,75 +601,63 @@ async def finish_order_and_level(
 
     Raises:
         aiosqlite.Error: On SQL execution error
-        json.JSONDecodeError: On deserialization error
+        orjson.JSONDecodeError: On deserialization error
     """
     try:
-        cur = await db.execute(
-            """SELECT total_orders, total_crosses, level, has_student_done,
-                      has_dirty_plate_done, has_critic_done, has_second_chef_done,
-                      active_order_json
-               FROM users WHERE user_id=?""",
-            (user_id,),
-        )
-        row = await cur.fetchone()
-        if not row:
-            raise ValueError(f"User {user_id} not found")
-
-        total = (row["total_orders"] or 0) + 1
-        total_crosses = (row["total_crosses"] or 0) + order_crosses
-        level = row["level"] or 0
-        has_student_done = row["has_student_done"] or 0
-        has_dirty_plate_done = row["has_dirty_plate_done"] or 0
-        has_critic_done = row["has_critic_done"] or 0
-        has_second_chef_done = row["has_second_chef_done"] or 0
-
-        # Update special event flags
-        if tag == "critic":
-            has_critic_done = 1
-        elif tag == "student":
-            has_student_done = 1
-        elif tag == "dirty_plate":
-            has_dirty_plate_done = 1
-        elif tag == "second_chef":
-            has_second_chef_done = 1
-
-        # Save last order for dirty plate event
-        active_order_data = row["active_order_json"]
+        # The level before the update tells whether this order levels up; handlers
+        # load the user first, so it normally comes from the cache
+        cached = _cached_user(user_id)
+        if cached is not None:
+            prev_level = cached["level"] or 0
+            active_order_data = cached["active_order_json"]
+        else:
+            cur = await db.execute(_SQL_FINISH_SELECT, (user_id,))
+            row = await cur.fetchone()
+            if not row:
+                raise ValueError(f"User {user_id} not found")
+            prev_level = row["level"] or 0
+            active_order_data = row["active_order_json"]
+
+        # Last order for dirty plate event (None keeps the previous one)
+        last_order_json = None
         if active_order_data:
             try:
-                payload = json.loads(active_order_data)
-                dishes = payload.get("dishes", [])
+                dishes = orjson.loads(active_order_data).get("dishes", [])
                 if dishes:
-                    await save_last_order(db, user_id, dishes, order_crosses, tag)
-            except (json.JSONDecodeError, Exception) as e:
-                logger.warning(f"Failed to save last order for {user_id}: {e}")
-
-        prev_level = level
-        if total % ORDERS_PER_LEVEL == 0 and level < MAX_LEVEL:
-            level += 1
-
-        await db.execute(
-            """UPDATE users SET total_orders=?, total_crosses=?, level=?,
-                      has_student_done=?, has_dirty_plate_done=?, has_critic_done=?,
-                      has_second_chef_done=?, active_order_json=NULL
-               WHERE user_id=?""",
-            (
-                total,
-                total_crosses,
-                level,
-                has_student_done,
-                has_dirty_plate_done,
-                has_critic_done,
-                has_second_chef_done,
-                user_id,
-            ),
+                    payload = {"dishes": dishes, "crosses": order_crosses, "tag": tag}
+                    last_order_json = orjson.dumps(payload)
+            except (orjson.JSONDecodeError, AttributeError, TypeError) as e:
+                logger.warning("Failed to save last order for {}: {}", user_id, e)
+
+        rows = await db.execute_fetchall(
+            _SQL_FINISH_UPDATE,
+            {
+                "crosses": order_crosses,
+                "per_level": ORDERS_PER_LEVEL,
+                "max_level": MAX_LEVEL,
+                **_TAG_FLAGS.get(tag or "", _NO_TAG_FLAGS),
+                "last_order": last_order_json,
+                "user_id": user_id,
+            },
         )
+        if not rows:
+            raise ValueError(f"User {user_id} not found")
         await db.commit()
+        # The returned Row is read by name directly, without copying it into a dict
+        updated = next(iter(rows))
+        _update_cached_user(user_id, **updated)
 
+        total = updated["total_orders"]
+        level = updated["level"]
         level_changed = level != prev_level
-        title = LEVELS.get(level, f"Level {level}")
-
-        return total, level_changed, title, total_crosses
-    except (aiosqlite.Error, json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Error finishing order for user {user_id}: {e}")
+        # LEVELS_TUPLE covers every level the UPDATE can produce; the fallback (same
+        # wording as /top) is only built for out-of-range levels in old data
+        if 0 <= level <= MAX_LEVEL:
+            title = LEVELS_TUPLE[level]
+        else:
+            title = LEVEL_FALLBACK.format(level=level)
+
+        return total, level_changed, title, updated["total_crosses"]
+    except (aiosqlite.Error, orjson.JSONDecodeError, ValueError) as e:
+        logger.error("Error finishing order for user {}: {}", user_id, e)
         raise
@@ -10,18 +10,13 @@ CALLBACK_MY = "order_my"
 CALLBACK_DONE = "order_done"
 
 
-def main_menu_kb() -> InlineKeyboardMarkup:
-    """
-    Build main menu with inline buttons (New order, My order, Done).
-
-    Returns:
-        InlineKeyboardMarkup
-    """
-    kb = [
+# Inline keyboards are immutable, so the main menu is built once and shared
+MAIN_MENU_KB = InlineKeyboardMarkup(
+    inline_keyboard=[
         [InlineKeyboardButton(text="🧾 Новый заказ", callback_data=CALLBACK_NEW)],
         [
             InlineKeyboardButton(text="📋 Мой заказ", callback_data=CALLBACK_MY),
             InlineKeyboardButton(text="✅ Готово", callback_data=CALLBACK_DONE),
         ],
     ]
-    return InlineKeyboardMarkup(inline_keyboard=kb)
+)
@@ -4,34 +4,188 @@ Entry point for the Telegram bot "Stitch Cafe".
 Initializes the bot, configures logging and starts update polling.
 """
 import asyncio
+import signal
+import sys
+from typing import Any
+from urllib.parse import urlsplit
 
 from aiogram import Bot, Dispatcher
+from aiogram import __version__ as aiogram_version
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import AsyncResolver, ClientSession, web
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
 from loguru import logger
 
 from commands.order import router as order_router
 from commands.reset import router as reset_router
 from commands.start import router as start_router
 from commands.top import router as top_router
-from config import BOT_TOKEN
-
-# Logging setup via loguru
-logger.add(
-    "logs/bot_{time:YYYY-MM-DD}.log",
-    rotation="00:00",
-    retention="30 days",
-    level="INFO",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
-    encoding="utf-8"
+from config import (
+    BOT_TOKEN,
+    DEBUG,
+    MAX_CONCURRENT_UPDATES,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
 )
+from database import close_db
+from middlewares.concurrency import ConcurrencyLimitMiddleware
+from utils import update_slots, wait_background_sends
+
+try:
+    # c-ares DNS resolution for Bot API connections. Optional, and not used on
+    # Windows, where aiodns can't run on the default Proactor event loop.
+    import aiodns
+except ImportError:
+    aiodns = None
+
+try:
+    # libuv-based event loop: faster socket I/O for polling and API calls.
+    # Optional, and not available on Windows.
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+def setup_logging() -> None:
+    """
+    Configure the console sink and add the daily rotated log file sink.
+
+    Called from main() once BOT_TOKEN is validated, so neither importing this
+    module nor a start without a token creates the logs directory. Records are
+    written by loguru's background thread (enqueue), so file writes and
+    rotation never block the event loop.
+
+    Outside DEBUG mode tracebacks skip loguru's extended backtrace and the
+    variable values annotation: they cost a walk over every frame and would
+    write local values (tokens, user data) to the logs.
+    """
+    logger.remove()
+    logger.add(
+        sys.stderr,
+        level="DEBUG" if DEBUG else "INFO",
+        backtrace=DEBUG,
+        diagnose=DEBUG,
+    )
+    logger.add(
+        "logs/bot_{time:YYYY-MM-DD}.log",
+        rotation="00:00",
+        retention="30 days",
+        level="INFO",
+        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+        encoding="utf-8",
+        enqueue=True,
+        backtrace=DEBUG,
+        diagnose=DEBUG,
+    )
+
+
+class BotApiSession(AiohttpSession):
+    """
+    HTTP session for Bot API calls with longer-lived keep-alive connections.
+
+    aiogram's session already keeps one pooled connector (100 connections, DNS
+    cached for an hour). aiohttp drops idle keep-alive sockets after 15 s, though,
+    so a send after a quiet spell pays a new TCP + TLS handshake; idle sockets
+    are kept for 75 s instead. With aiodns installed, host names are resolved
+    by aiohttp's AsyncResolver instead of getaddrinfo in a thread pool.
+    """
+
+    def connector_options(self) -> dict[str, Any]:
+        """
+        Keyword arguments for the TCP connector: aiogram's defaults plus ours.
+
+        Returns:
+            dict: Arguments for the connector
+        """
+        options = dict(self._connector_init)
+        options["keepalive_timeout"] = 75
+        if aiodns is not None and sys.platform != "win32":
+            # Created here, inside create_session, since it binds to the running loop
+            options["resolver"] = AsyncResolver()
+        return options
+
+    async def create_session(self) -> ClientSession:
+        """
+        Return the aiohttp session, creating it (and its connector) on first use.
+
+        Same as AiohttpSession.create_session of aiogram 3.31, which offers no hook
+        for connector options, except that the connector is built from
+        connector_options(). Recheck against the base class on aiogram upgrades.
+
+        Returns:
+            ClientSession: Session for Bot API requests
+        """
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self.connector_options()),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{aiogram_version}"},
+            )
+            self._should_reset_connector = False
+
+        return self._session
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, allowed_updates: list[str]) -> None:
+    """
+    Serve updates pushed by Telegram to WEBHOOK_URL until SIGINT/SIGTERM.
+
+    Telegram delivers each update as its own HTTP request, so there are no
+    getUpdates round-trips and updates are handled as they arrive. On a stop
+    signal the server shuts down cleanly: dispatcher shutdown hooks first,
+    then the bot session.
+
+    Args:
+        bot: Bot instance
+        dp: Dispatcher with the routers included
+        allowed_updates: Update types to request from Telegram
+    """
+    secret = WEBHOOK_SECRET or None
+    app = web.Application()
+    # Dispatcher startup/shutdown hooks run with the app; set up before the request
+    # handler, whose own shutdown hook closes the bot session
+    setup_application(app, dp, bot=bot)
+    # Each webhook request is handled in its own task; cap how many run at once
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(update_slots))
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(
+        app, path=urlsplit(WEBHOOK_URL).path or "/"
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C still cancels the run via KeyboardInterrupt
+            pass
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        await bot.set_webhook(WEBHOOK_URL, allowed_updates=allowed_updates, secret_token=secret)
+        logger.info("Webhook server listening on {}:{}", WEBHOOK_HOST, WEBHOOK_PORT)
+        await stop.wait()
+        logger.info("Stopping webhook server")
+    finally:
+        await runner.cleanup()
 
 
 async def main() -> None:
     """
     Main entry point for starting the bot.
 
-    Initializes the bot, registers routers and starts polling.
+    Initializes the bot, registers routers and starts polling, or the webhook
+    server when WEBHOOK_URL is set.
     Handles startup errors and logs them.
 
     Raises:
@@ -41,23 +195,47 @@ async def main() -> None:
         logger.error("BOT_TOKEN is not set. Fill in .env")
         raise RuntimeError("BOT_TOKEN is not set. Fill in .env")
 
+    setup_logging()
+
     try:
         logger.info("Starting bot...")
-        bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+        bot = Bot(
+            token=BOT_TOKEN,
+            session=BotApiSession(),
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        )
         dp = Dispatcher()
-        dp.include_router(start_router)
-        dp.include_router(order_router)
-        dp.include_router(reset_router)
-        dp.include_router(top_router)
+        # Shutdown hooks run in order, before the bot session is closed
+        dp.shutdown.register(wait_background_sends)
+        dp.shutdown.register(close_db)
+        dp.include_routers(start_router, order_router, reset_router, top_router)
 
         logger.info("Bot is up and ready")
-        await dp.start_polling(bot, allowed_updates=["message", "callback_query", "chat_member"])
+        # Update types are taken from the registered handlers
+        allowed_updates = dp.resolve_used_update_types()
+        if WEBHOOK_URL:
+            await run_webhook(bot, dp, allowed_updates)
+            return
+
+        # A webhook left over from a webhook run would make getUpdates fail
+        await bot.delete_webhook()
+        # Long poll held open 30 s instead of aiogram's 10 s: fewer idle getUpdates
+        # round-trips. At most MAX_CONCURRENT_UPDATES update tasks run at once; the
+        # rest wait before their task is started
+        await dp.start_polling(
+            bot,
+            polling_timeout=30,
+            allowed_updates=allowed_updates,
+            tasks_concurrency_limit=MAX_CONCURRENT_UPDATES,
+        )
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
-        logger.exception(f"Critical error while running bot: {e}")
+        logger.exception("Critical error while running bot: {}", e)
         raise
 
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
@@ -0,0 +1,37 @@
+"""
+Concurrency limit middleware.
+
+Caps the number of updates handled at the same time.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Let an update run its handlers only while holding one of the given slots.
+
+    Used in webhook mode, where aiogram starts a task per incoming request, so a
+    burst of updates would otherwise run all at once and pile up on the database
+    lock; extra updates wait here instead. Polling mode is capped by aiogram itself.
+    """
+
+    def __init__(self, slots: asyncio.Semaphore) -> None:
+        """
+        Args:
+            slots: Semaphore shared with background sends (utils.update_slots)
+        """
+        self._sem = slots
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        async with self._sem:
+            return await handler(event, data)
@@ -1,33 +1,128 @@
 """
 Shared utilities for the bot.
 
-Message formatting and admin checks.
+Message formatting, admin checks and background sending.
 """
-from config import ADMIN_IDS
+import asyncio
+from collections.abc import Awaitable
+from functools import lru_cache
+from typing import Any
 
+from loguru import logger
 
+from config import ADMIN_IDS, MAX_CONCURRENT_UPDATES
+
+# Strong references to in-flight background sends (the loop keeps only weak ones)
+_background_tasks: set[asyncio.Task[Any]] = set()
+
+# Slots shared by webhook update handling and background sends, so neither can
+# run more than MAX_CONCURRENT_UPDATES Bot API calls or handlers at once
+update_slots = asyncio.Semaphore(MAX_CONCURRENT_UPDATES)
+
+# Characters Telegram's HTML parse mode treats as markup, as a str.translate table
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+# Mention markup as a %-template: (user_id, escaped first name)
+_MENTION_TMPL = "<a href='tg://user?id=%d'>%s</a>"
+
+
+def escape_html(text: str) -> str:
+    """
+    Escape user-supplied text for messages sent with HTML parse mode.
+
+    Args:
+        text: Raw text (e.g. a user's first name)
+
+    Returns:
+        Text with &, <, > and " replaced by HTML entities
+    """
+    return text.translate(_HTML_ESCAPE)
+
+
+@lru_cache(maxsize=4096)
 def format_user_mention(user_id: int, first_name: str) -> str:
     """
     Format user as Telegram mention (clickable link).
 
+    Cached, since the same players ask for their orders over and over. The name
+    is HTML-escaped, so names with <, > or & neither break nor inject markup.
+
     Args:
         user_id: Telegram user ID
-        first_name: User first name
+        first_name: User first name (raw)
 
     Returns:
         HTML string with user mention
     """
-    return f"<a href='tg://user?id={user_id}'>{first_name}</a>"
+    return _MENTION_TMPL % (user_id, first_name.translate(_HTML_ESCAPE))
 
 
-def is_admin(user_id: str) -> bool:
+def is_admin(user_id: int) -> bool:
     """
     Check if user is a bot admin.
 
     Args:
-        user_id: Telegram user ID (string)
+        user_id: Telegram user ID
 
     Returns:
         True if user is admin
     """
-    return str(user_id) in ADMIN_IDS
+    return user_id in ADMIN_IDS
+
+
+def _on_background_done(task: asyncio.Task[Any]) -> None:
+    """
+    Drop the finished task reference and log its failure, if any.
+
+    Args:
+        task: Finished background task
+    """
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error("Error sending message in background")
+
+
+async def _run_in_slot(call: Awaitable[Any]) -> Any:
+    """
+    Await the call while holding one of the update slots.
+
+    Args:
+        call: Awaitable API call
+
+    Returns:
+        Result of the call
+    """
+    async with update_slots:
+        return await call
+
+
+def send_in_background(call: Awaitable[Any]) -> None:
+    """
+    Schedule a Telegram API call without waiting for its result.
+
+    Lets the handler return right away instead of blocking on the network round-trip.
+    Only for calls the user doesn't see as a message, such as callback query acks:
+    background calls are not ordered with the chat's replies. Each call takes one
+    of the update slots while it runs. Errors are logged, since there is no caller
+    left to handle them.
+
+    Args:
+        call: Awaitable API call (e.g. callback_query.answer())
+    """
+    task = asyncio.ensure_future(_run_in_slot(call))
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+
+
+async def wait_background_sends(timeout: float = 10.0) -> None:
+    """
+    Wait for in-flight background sends (called on bot shutdown).
+
+    Runs before the bot session is closed, so replies already scheduled by
+    handlers still reach Telegram.
+
+    Args:
+        timeout: Maximum time to wait, in seconds
+    """
+    if _background_tasks:
+        await asyncio.wait(list(_background_tasks), timeout=timeout)